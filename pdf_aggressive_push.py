@@ -4,6 +4,7 @@
 #
 # Does:
 # - Prompts for commit message EVERY run
+# - Runs pdf_preflight.py and stops if any PDF is truncated / corrupt
 # - Runs pdf_builder.py to regenerate index.html
 # - git add -A, commit if needed, push to GitHub
 
@@ -16,6 +17,7 @@ REMOTE_URL = "https://github.com/ronandownes/PDF.git"
 REMOTE_NAME = "origin"
 BRANCH = "main"
 BUILDER = "pdf_builder.py"
+PREFLIGHT = "pdf_preflight.py"
 
 DEFAULT_USER_NAME = "Ronan Downes"
 DEFAULT_USER_EMAIL = "ronandownes@users.noreply.github.com"
@@ -75,6 +77,16 @@ def main():
 
     msg = input("\nCommit message (every run): ").strip() or "update"
 
+    # keep half-copied / corrupt PDFs out of the commit (report only: moving
+    # them here would commit their deletion from the published site)
+    preflight_path = repo_root / PREFLIGHT
+    if preflight_path.is_file():
+        if run([sys.executable, str(preflight_path)]) != 0:
+            print("\nERROR: Bad PDF(s) listed above. Fix or remove them, then run again.")
+            raise SystemExit(1)
+    else:
+        print(f"WARNING: {PREFLIGHT} not found; skipping integrity check.")
+
     # rebuild index
     builder_path = repo_root / BUILDER
     if builder_path.is_file():
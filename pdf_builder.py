@@ -6,16 +6,30 @@
 # rendered client-side using PDF.js (CDN) with lazy loading.
 #
 # PDFs are assumed to be in the SAME folder as this script (repo root).
+# Truncated / corrupt PDFs (pdf_preflight.py) are reported, not moved.
+# Cards are rendered from the catalogue (pdf_catalogue.py), which is synced first.
+#
+# Outlines (bookmarks) are resolved to page numbers at build time and written to
+# outlines/<pdf name>.json as [[level, title, page], ...]. A card only fetches its
+# file when "Contents" is clicked; each entry links to <pdf>#page=N.
+# (needs: pip install pypdf; without it cards simply have no Contents button)
 
 from __future__ import annotations
 
 import html
+import json
+import logging
 from pathlib import Path
 from urllib.parse import quote
 from datetime import datetime
 
+import pdf_catalogue
+from pdf_preflight import filter_good
+
 ROOT = Path(__file__).resolve().parent
 OUT = ROOT / "index.html"
+OUTLINE_DIR = ROOT / "outlines"
+OUTLINE_MANIFEST = OUTLINE_DIR / "index.json"
 
 BRAND = "Mr Downes Maths"
 TITLE = "PDF Gallery"
@@ -36,11 +50,98 @@ def gather_pdfs() -> list[Path]:
         key=lambda p: p.name.lower(),
     )
 
+def extract_outline(p: Path) -> list[list] | None:
+    """
+    [[level, title, page], ...] for p's outline, page 1-based, or None if it
+    could not be read (no pypdf, or the outline is broken).
+    PdfReader only parses the objects it is asked for, so this touches the
+    outline tree and the page tree, not page contents.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return None
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+
+    reader = PdfReader(p)
+    out = []
+
+    def walk(items, level):
+        for it in items:
+            if isinstance(it, list):
+                walk(it, level + 1)
+                continue
+            try:
+                page = reader.get_destination_page_number(it)
+            except Exception:
+                continue
+            title = " ".join(str(it.title or "").split())
+            if page is not None and page >= 0 and title:
+                out.append([level, title, page + 1])
+
+    try:
+        walk(reader.outline, 0)
+    except Exception:
+        return None
+    return out
+
+def outline_file(name: str) -> Path:
+    return OUTLINE_DIR / f"{name}.json"
+
+def sync_outlines(files: list[dict]) -> dict[str, int]:
+    """
+    Refresh outlines/ for changed PDFs only (by size + mtime, kept in
+    outlines/index.json) and drop files for PDFs that are gone. PDFs whose
+    outline could not be read are left out of the manifest and retried.
+    Returns {pdf name: number of outline entries}.
+    """
+    try:
+        manifest = json.loads(OUTLINE_MANIFEST.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        manifest = {}
+
+    fresh = {}
+    for f in files:
+        stamp = [f["size"], f["mtime"]]
+        old = manifest.get(f["name"])
+        if old and old[:2] == stamp:
+            fresh[f["name"]] = old
+            continue
+        try:
+            entries = extract_outline(ROOT / f["name"])
+        except Exception:
+            entries = None
+        target = outline_file(f["name"])
+        if entries is None:
+            # Not recorded in the manifest, so the next build tries again
+            # (e.g. once pypdf is installed)
+            target.unlink(missing_ok=True)
+            continue
+        if entries:
+            OUTLINE_DIR.mkdir(exist_ok=True)
+            target.write_text(json.dumps(entries, ensure_ascii=False, separators=(",", ":")),
+                              encoding="utf-8")
+        elif target.exists():
+            target.unlink()
+        fresh[f["name"]] = stamp + [len(entries)]
+
+    for name in set(manifest) - set(fresh):
+        outline_file(name).unlink(missing_ok=True)
+
+    if fresh != manifest:
+        OUTLINE_DIR.mkdir(exist_ok=True)
+        OUTLINE_MANIFEST.write_text(json.dumps(fresh, indent=0, sort_keys=True), encoding="utf-8")
+    return {name: v[2] for name, v in fresh.items()}
+
 def build_html(rows: list[dict]) -> str:
     dot_html = "".join([f'<span class="dot" style="background:{c}"></span>' for c in DOTS])
 
     cards = []
     for r in rows:
+        toc_btn = (
+            f'<button class="btn ghost toc-btn" type="button" data-outline="{r["outline"]}">Contents</button>'
+            if r["outline"] else ""
+        )
         cards.append(f"""
         <article class="card"
           data-name="{html.escape(r['name_l'])}"
@@ -54,10 +155,12 @@ def build_html(rows: list[dict]) -> str:
           <div class="card-body">
             <a class="fname" href="{r['href']}" target="_blank" rel="noopener">{r['name']}</a>
             <div class="meta">{r['size_h']} · {r['date_h']}</div>
+            <nav class="toc hidden" aria-label="Contents"></nav>
 
             <div class="actions">
               <a class="btn" href="{r['href']}" target="_blank" rel="noopener">View</a>
               <a class="btn ghost" href="{r['href']}" download>Download</a>
+              {toc_btn}
             </div>
           </div>
         </article>
@@ -180,6 +283,15 @@ def build_html(rows: list[dict]) -> str:
     background:var(--btn);color:var(--btnText);text-decoration:none;font-size:12px;
   }}
   .btn.ghost{{background:#fff;color:var(--btn)}}
+  button.btn{{cursor:pointer;font-family:inherit}}
+
+  .toc{{
+    max-height:220px;overflow:auto;border:1px solid var(--line);border-radius:10px;
+    padding:6px 8px;background:var(--soft);font-size:12px;line-height:1.35;
+  }}
+  .toc a{{display:flex;gap:6px;justify-content:space-between;color:var(--text);text-decoration:none;padding:2px 0}}
+  .toc a:hover{{text-decoration:underline}}
+  .toc .pg{{color:var(--muted);flex:none}}
 
   .hidden{{display:none !important}}
 
@@ -353,6 +465,47 @@ def build_html(rows: list[dict]) -> str:
       }}
     }}
 
+    // --- Outline / contents (loaded on demand) ---
+    async function toggleToc(btn) {{
+      const card = btn.closest('.card');
+      const nav = card.querySelector('.toc');
+      if (nav.dataset.loaded) {{
+        nav.classList.toggle('hidden');
+        return;
+      }}
+      if (nav.dataset.loading) return;  // fetch already in flight
+      nav.dataset.loading = '1';
+      const pdf = card.querySelector('.fname').getAttribute('href');
+      try {{
+        const entries = await (await fetch(btn.dataset.outline)).json();
+        for (const [level, title, page] of entries) {{
+          const a = document.createElement('a');
+          a.href = pdf + '#page=' + page;
+          a.target = '_blank';
+          a.rel = 'noopener';
+          a.style.paddingLeft = (level * 10) + 'px';
+          const t = document.createElement('span');
+          t.textContent = title;
+          const pg = document.createElement('span');
+          pg.className = 'pg';
+          pg.textContent = page;
+          a.append(t, pg);
+          nav.appendChild(a);
+        }}
+        nav.dataset.loaded = '1';
+        nav.classList.remove('hidden');
+      }} catch (e) {{
+        btn.disabled = true;
+      }} finally {{
+        delete nav.dataset.loading;
+      }}
+    }}
+
+    grid.addEventListener('click', (e) => {{
+      const btn = e.target.closest('.toc-btn');
+      if (btn) toggleToc(btn);
+    }});
+
     // Initial:
     sortCards();
     applyFilter();
@@ -363,22 +516,32 @@ def build_html(rows: list[dict]) -> str:
 """
 
 def main() -> None:
+    con = pdf_catalogue.connect()
+    pdfs = gather_pdfs()
+    filter_good(pdfs, move_bad=False)  # report only; never move published files
+    counts = pdf_catalogue.sync(pdfs, con=con)
+    files = pdf_catalogue.files(con)
+    outlines = sync_outlines(files)
+
     rows = []
-    for p in gather_pdfs():
-        st = p.stat()
+    for f in files:
         rows.append({
-            "name": html.escape(p.name),
-            "name_l": p.name.lower(),
-            "href": quote(p.name),
-            "size": st.st_size,
-            "size_h": html.escape(human_size(st.st_size)),
-            "mtime": int(st.st_mtime),
-            "date_h": html.escape(datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d")),
+            "name": html.escape(f["name"]),
+            "name_l": f["name"].lower(),
+            "href": quote(f["name"]),
+            "size": f["size"],
+            "size_h": html.escape(human_size(f["size"])),
+            "mtime": f["mtime"],
+            "date_h": html.escape(datetime.fromtimestamp(f["mtime"]).strftime("%Y-%m-%d")),
+            "outline": quote(f"{OUTLINE_DIR.name}/{f['name']}.json") if outlines.get(f["name"]) else "",
         })
+    con.close()
 
     OUT.write_text(build_html(rows), encoding="utf-8")
     print(f"Wrote: {OUT}")
     print(f"PDFs found: {len(rows)}")
+    print(f"With outline: {sum(1 for r in rows if r['outline'])}")
+    print(f"Catalogue: {counts['added']} added, {counts['updated']} updated, {counts['removed']} removed")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,314 @@
+# pdf_catalogue.py
+# Location: E:/pdfhub/pdf/
+# Run:      python pdf_catalogue.py sync
+#           python pdf_catalogue.py query vectors --name spec --since 2026
+#           python pdf_catalogue.py moves
+#
+# Persistent catalogue of the PDFs in this folder (SQLite, .pdfhub.sqlite):
+# - files: name, size, mtime, sha256, page count, PDF metadata
+# - text:  extracted text, searchable with FTS5 (porter stemming)
+# - moves: history written by pdf_optimised_mover.py / pdf_you_pick_mover.py
+#
+# sync() is incremental: only files whose size/mtime changed are re-hashed and
+# re-read (in a process pool), and all writes go in one batched transaction.
+# pdf_builder.py renders index.html from files() after a sync().
+#
+# Page count / metadata / text need: pip install pypdf  (without it only
+# name, size, mtime and hash are catalogued)
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib.util
+import logging
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent                  # E:/pdfhub/pdf
+DB_FILE = ROOT / ".pdfhub.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id         INTEGER PRIMARY KEY,
+    name       TEXT NOT NULL UNIQUE,
+    size       INTEGER NOT NULL,
+    mtime      INTEGER NOT NULL,
+    sha256     TEXT,
+    pages      INTEGER,
+    title      TEXT,
+    author     TEXT,
+    subject    TEXT,
+    keywords   TEXT,
+    created    TEXT,
+    modified   TEXT,
+    parsed     INTEGER NOT NULL DEFAULT 0,  -- 1 once pypdf has read pages/metadata/text
+    indexed_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_mtime ON files(mtime);
+CREATE INDEX IF NOT EXISTS files_sha256 ON files(sha256);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS text USING fts5(
+    name, title, body, tokenize = 'porter unicode61'
+);
+
+CREATE TABLE IF NOT EXISTS moves (
+    id     INTEGER PRIMARY KEY,
+    at     INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    src    TEXT NOT NULL,
+    dst    TEXT NOT NULL
+);
+"""
+
+FILE_COLS = ("name", "size", "mtime", "sha256", "pages", "title", "author",
+             "subject", "keywords", "created", "modified", "parsed", "indexed_at")
+
+def connect(db_file: Path = DB_FILE) -> sqlite3.Connection:
+    con = sqlite3.connect(db_file)
+    con.row_factory = sqlite3.Row
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.executescript(SCHEMA)
+    # catalogues created before the parsed column existed
+    if "parsed" not in {r["name"] for r in con.execute("PRAGMA table_info(files)")}:
+        con.execute("ALTER TABLE files ADD COLUMN parsed INTEGER NOT NULL DEFAULT 0")
+    return con
+
+def _meta(v) -> str | None:
+    return str(v) if v not in (None, "") else None
+
+def scan_pdf(path: str) -> dict:
+    """
+    Hash and (if pypdf is available) read one PDF. Runs in a worker process,
+    so it takes/returns plain types.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    rec = {"sha256": h.hexdigest(), "pages": None, "title": None, "author": None,
+           "subject": None, "keywords": None, "created": None, "modified": None, "body": "",
+           "parsed": 0}
+
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return rec
+    logging.getLogger("pypdf").setLevel(logging.ERROR)  # font warnings are noise here
+
+    try:
+        reader = PdfReader(path)
+        rec["pages"] = len(reader.pages)
+        info = reader.metadata or {}
+        rec["title"] = _meta(info.get("/Title"))
+        rec["author"] = _meta(info.get("/Author"))
+        rec["subject"] = _meta(info.get("/Subject"))
+        rec["keywords"] = _meta(info.get("/Keywords"))
+        rec["created"] = _meta(info.get("/CreationDate"))
+        rec["modified"] = _meta(info.get("/ModDate"))
+        parts = []
+        for page in reader.pages:
+            try:
+                parts.append(page.extract_text() or "")
+            except Exception:
+                continue
+        rec["body"] = "\n".join(parts)
+        rec["parsed"] = 1
+    except Exception:
+        pass  # keep the hash; metadata/text stay empty for unreadable files
+    return rec
+
+def sync(paths: list[Path] | None = None, con: sqlite3.Connection | None = None,
+         workers: int | None = None) -> dict:
+    """
+    Bring the catalogue in line with paths (default: all PDFs in ROOT).
+    Returns counts {"added", "updated", "removed", "unchanged"}.
+    Files whose last scan could not read them with pypdf (not installed, or
+    the read failed) are scanned again whenever pypdf is available.
+    """
+    if paths is None:
+        with os.scandir(ROOT) as it:
+            paths = [Path(e.path) for e in it if e.is_file() and e.name.lower().endswith(".pdf")]
+    own = con is None
+    con = con or connect()
+
+    have_pypdf = importlib.util.find_spec("pypdf") is not None
+    known = {r["name"]: (r["size"], r["mtime"]) for r in con.execute("SELECT name, size, mtime FROM files")}
+    unparsed = {r["name"] for r in con.execute("SELECT name FROM files WHERE parsed = 0")} if have_pypdf else set()
+    stats = {}
+    todo = []
+    for p in paths:
+        st = p.stat()
+        stats[p.name] = (st.st_size, int(st.st_mtime))
+        if known.get(p.name) != stats[p.name] or p.name in unparsed:
+            todo.append(p)
+
+    scanned = []
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            scanned = list(pool.map(scan_pdf, [str(p) for p in todo], chunksize=4))
+
+    now = int(time.time())
+    file_rows = []
+    text_rows = []
+    for p, rec in zip(todo, scanned):
+        size, mtime = stats[p.name]
+        file_rows.append((p.name, size, mtime, rec["sha256"], rec["pages"], rec["title"],
+                          rec["author"], rec["subject"], rec["keywords"], rec["created"],
+                          rec["modified"], rec["parsed"], now))
+        text_rows.append((p.name, rec["title"] or "", rec["body"], p.name))
+    gone = [(n,) for n in known if n not in stats]
+
+    placeholders = ", ".join("?" for _ in FILE_COLS)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in FILE_COLS[1:])
+    with con:
+        con.executemany("DELETE FROM text WHERE rowid IN (SELECT id FROM files WHERE name = ?)",
+                        [(r[0],) for r in file_rows] + gone)
+        con.executemany("DELETE FROM files WHERE name = ?", gone)
+        con.executemany(
+            f"INSERT INTO files ({', '.join(FILE_COLS)}) VALUES ({placeholders}) "
+            f"ON CONFLICT(name) DO UPDATE SET {updates}",
+            file_rows,
+        )
+        con.executemany(
+            "INSERT INTO text (rowid, name, title, body) SELECT id, ?, ?, ? FROM files WHERE name = ?",
+            text_rows,
+        )
+
+    if own:
+        con.close()
+    added = sum(1 for p in todo if p.name not in known)
+    return {"added": added, "updated": len(todo) - added, "removed": len(gone),
+            "unchanged": len(stats) - len(todo)}
+
+def files(con: sqlite3.Connection | None = None) -> list[dict]:
+    """All catalogued files, ordered by name (case-insensitive)."""
+    own = con is None
+    con = con or connect()
+    rows = [dict(r) for r in con.execute("SELECT * FROM files ORDER BY lower(name)")]
+    if own:
+        con.close()
+    return rows
+
+def _since_ts(since: str | None) -> int:
+    """'2026', '2026-03' or '2026-03-01' -> epoch seconds (0 if None)."""
+    if not since:
+        return 0
+    for fmt in ("%Y-%m-%d", "%Y-%m", "%Y"):
+        try:
+            return int(datetime.strptime(since, fmt).timestamp())
+        except ValueError:
+            continue
+    raise ValueError(f"bad date {since!r} (use YYYY, YYYY-MM or YYYY-MM-DD)")
+
+def query(text: str | None = None, name: str | None = None, since: str | None = None,
+          limit: int = 50, con: sqlite3.Connection | None = None) -> list[dict]:
+    """
+    Search the catalogue.
+    text:  FTS5 query over name/title/body (e.g. 'vectors', '"unit circle"', 'vector*')
+    name:  case-insensitive substring of the file name
+    since: only files modified on/after YYYY[-MM[-DD]]
+    Results are best match first (or newest first when there is no text).
+    """
+    own = con is None
+    con = con or connect()
+    where = ["f.mtime >= ?"]
+    args: list = [_since_ts(since)]
+    if name:
+        where.append("f.name LIKE ?")
+        args.append(f"%{name}%")
+
+    if text:
+        sql = (
+            "SELECT f.*, snippet(text, 2, '[', ']', '…', 12) AS snippet FROM text "
+            "JOIN files f ON f.id = text.rowid "
+            f"WHERE text MATCH ? AND {' AND '.join(where)} ORDER BY bm25(text) LIMIT ?"
+        )
+        args = [text] + args
+    else:
+        sql = f"SELECT f.*, NULL AS snippet FROM files f WHERE {' AND '.join(where)} ORDER BY f.mtime DESC LIMIT ?"
+    args.append(limit)
+
+    rows = [dict(r) for r in con.execute(sql, args)]
+    if own:
+        con.close()
+    return rows
+
+def record_move(src: Path | str, dst: Path | str, action: str = "moved") -> None:
+    """Append one entry to the move history. Never raises: history is best-effort."""
+    record_moves([(src, dst, action)])
+
+def record_moves(entries: list[tuple], con: sqlite3.Connection | None = None) -> None:
+    """
+    Append (src, dst, action) entries to the move history in one transaction.
+    Never raises: history is best-effort.
+    """
+    if not entries:
+        return
+    now = int(time.time())
+    own = con is None
+    try:
+        con = con or connect()
+        with con:
+            con.executemany("INSERT INTO moves (at, action, src, dst) VALUES (?, ?, ?, ?)",
+                            [(now, action, str(src), str(dst)) for src, dst, action in entries])
+    except sqlite3.Error as e:
+        print(f"WARNING: could not record move(s) in catalogue: {e}")
+    finally:
+        if own and con is not None:
+            con.close()
+
+def moves(limit: int = 50, con: sqlite3.Connection | None = None) -> list[dict]:
+    own = con is None
+    con = con or connect()
+    rows = [dict(r) for r in con.execute("SELECT * FROM moves ORDER BY id DESC LIMIT ?", (limit,))]
+    if own:
+        con.close()
+    return rows
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="pdfhub", description="Query the PDF catalogue.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("sync", help="update the catalogue from the PDFs in this folder")
+    q = sub.add_parser("query", help="search the catalogue")
+    q.add_argument("text", nargs="?", help="full-text query (FTS5 syntax)")
+    q.add_argument("--name", help="file name contains")
+    q.add_argument("--since", help="modified on/after YYYY[-MM[-DD]]")
+    q.add_argument("--limit", type=int, default=50)
+    m = sub.add_parser("moves", help="show recent mover history")
+    m.add_argument("--limit", type=int, default=50)
+    ns = ap.parse_args(argv)
+
+    if ns.cmd == "sync":
+        t0 = time.perf_counter()
+        c = sync()
+        print(f"Added: {c['added']}  Updated: {c['updated']}  Removed: {c['removed']}  "
+              f"Unchanged: {c['unchanged']}  ({time.perf_counter() - t0:.2f}s)")
+    elif ns.cmd == "query":
+        t0 = time.perf_counter()
+        try:
+            rows = query(ns.text, ns.name, ns.since, ns.limit)
+        except (ValueError, sqlite3.OperationalError) as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 2
+        for r in rows:
+            date = datetime.fromtimestamp(r["mtime"]).strftime("%Y-%m-%d")
+            pages = f"{r['pages']}p" if r["pages"] is not None else "?p"
+            print(f"{date}  {pages:>5}  {r['name']}")
+            if r["snippet"]:
+                print("      " + " ".join(r["snippet"].split()))
+        print(f"\n{len(rows)} match(es) in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    else:
+        for r in moves(ns.limit):
+            when = datetime.fromtimestamp(r["at"]).strftime("%Y-%m-%d %H:%M")
+            print(f"{when}  {r['action']:<8} {r['src']}  ->  {r['dst']}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,309 @@
+# pdf_image_downsampler.py
+# Location: E:/pdfhub/pdf/
+# Run:      python E:/pdfhub/pdf/pdf_image_downsampler.py [files...] [--dpi 150] [--quality 80]
+#
+# OPT-IN lossy optimiser for scanned / image-heavy PDFs:
+# - Source: parent folder (E:/pdfhub/) unless files are given on the command line
+# - Finds image XObjects and works out their effective DPI from where the page
+#   content actually draws them (cm / Do, including nested forms)
+# - Images above the target DPI are area-resampled with NumPy and re-encoded as JPEG
+# - One worker process per file (ProcessPoolExecutor)
+# - Writes "<name>_optimised.pdf" next to the input, so pdf_optimised_mover.py
+#   picks it up on its next run
+# - Never keeps an output that is not smaller than its input
+#
+# Needs: pip install pypdf numpy pillow
+
+from __future__ import annotations
+
+import argparse
+import io
+import math
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from pdf_builder import human_size
+from pdf_optimised_mover import KEYWORD, SRC_DIR
+
+TARGET_DPI = 150
+JPEG_QUALITY = 80
+MIN_RATIO = 1.25        # don't bother re-encoding for a smaller reduction
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+def mat_mul(m: tuple, n: tuple) -> tuple:
+    """PDF matrix product m x n (both [a b c d e f])."""
+    a1, b1, c1, d1, e1, f1 = m
+    a2, b2, c2, d2, e2, f2 = n
+    return (
+        a1 * a2 + b1 * c2,
+        a1 * b2 + b1 * d2,
+        c1 * a2 + d1 * c2,
+        c1 * b2 + d1 * d2,
+        e1 * a2 + f1 * c2 + e2,
+        e1 * b2 + f1 * d2 + f2,
+    )
+
+def placed_size_pt(ctm: tuple) -> tuple[float, float]:
+    """Width/height in points of the unit square drawn under ctm."""
+    a, b, c, d, _, _ = ctm
+    return math.hypot(a, b), math.hypot(c, d)
+
+def collect_image_dpi(reader, page) -> dict:
+    """
+    Walk the page content and return {image indirect ref idnum: effective DPI}.
+    The DPI kept is the lowest one, i.e. where the image is drawn largest, so
+    it is never downsampled below the target there.
+    """
+    from pypdf.generic import ContentStream
+
+    dpi: dict = {}
+
+    def walk(content, resources, base_ctm, seen):
+        xobjects = (resources or {}).get("/XObject")
+        xobjects = xobjects.get_object() if xobjects is not None else {}
+        if content is None:
+            return
+        ctm = base_ctm
+        stack = []
+        for operands, op in ContentStream(content, reader).operations:
+            if op == b"q":
+                stack.append(ctm)
+            elif op == b"Q":
+                ctm = stack.pop() if stack else base_ctm
+            elif op == b"cm":
+                ctm = mat_mul(tuple(float(v) for v in operands), ctm)
+            elif op == b"Do":
+                ref = xobjects.get(operands[0])
+                if ref is None or not hasattr(ref, "idnum"):
+                    continue
+                xobj = ref.get_object()
+                subtype = xobj.get("/Subtype")
+                if subtype == "/Image":
+                    w_pt, h_pt = placed_size_pt(ctm)
+                    if w_pt <= 0 or h_pt <= 0:
+                        continue
+                    d = min(
+                        float(xobj["/Width"]) * 72.0 / w_pt,
+                        float(xobj["/Height"]) * 72.0 / h_pt,
+                    )
+                    dpi[ref.idnum] = min(dpi.get(ref.idnum, d), d)
+                elif subtype == "/Form" and ref.idnum not in seen:
+                    matrix = tuple(float(v) for v in xobj.get("/Matrix", IDENTITY))
+                    walk(xobj, xobj.get("/Resources", resources),
+                         mat_mul(matrix, ctm), seen | {ref.idnum})
+
+    walk(page.get_contents(), page.get("/Resources"), IDENTITY, frozenset())
+    return dpi
+
+def area_axis(a, n_out: int, axis: int):
+    """
+    Area-average array a down to n_out samples along one axis (float32 result).
+    Integer ratios are a reshape + mean; otherwise the whole input pixels of
+    each output are summed slice by slice and the pixels straddling its edges
+    are added back by their fractional coverage. Cost is O(input size).
+    """
+    import numpy as np
+
+    n_in = a.shape[axis]
+    if n_in == n_out:
+        return a.astype(np.float32)
+    a = np.moveaxis(a, axis, 0)
+    if axis:
+        a = np.ascontiguousarray(a)                     # slices along axis 0 must be contiguous to be quick
+    if n_in % n_out == 0:
+        out = a.reshape((n_out, n_in // n_out) + a.shape[1:]).mean(axis=1, dtype=np.float32)
+    elif n_out > n_in:
+        # enlarging (a soft mask smaller than its image): nearest pixel
+        idx = ((np.arange(n_out) + 0.5) * (n_in / n_out)).astype(np.intp)
+        out = a[idx].astype(np.float32)
+    else:
+        scale = n_in / n_out
+        lo = np.arange(n_out) * scale
+        first = lo.astype(np.intp)                      # input pixel each output starts in
+        frac = (lo - first).astype(np.float32).reshape((n_out,) + (1,) * (a.ndim - 1))
+        bounds = np.append(first, n_in)
+        out = np.empty((n_out,) + a.shape[1:], dtype=np.float32)
+        for i in range(n_out):                          # whole pixels of each output
+            np.add.reduce(a[bounds[i]:bounds[i + 1]], axis=0, dtype=np.float32, out=out[i])
+        out -= frac * a[first]                          # part of the first pixel before lo
+        out[:-1] += frac[1:] * a[first[1:]]             # part of the next pixel before hi
+        out /= scale
+    return np.moveaxis(out, 0, axis)
+
+def area_resample(arr, h2: int, w2: int):
+    """
+    Shrink an HxW or HxWxC uint8 array to h2 x w2 by area averaging, one axis
+    at a time (rows first, so the float32 copy is already h2 rows tall).
+    """
+    import numpy as np
+
+    out = area_axis(area_axis(arr, h2, 0), w2, 1)
+    return np.clip(out + 0.5, 0, 255).astype(np.uint8)
+
+def reencode_image(xobj, ratio: float, quality: int) -> bool:
+    """Downsample one image XObject in place. Returns True if it was replaced."""
+    import numpy as np
+    from PIL import Image
+    from pypdf.generic import NameObject, NumberObject
+
+    # Stencil masks and colour-key masks need exact pixel values; JPEG would break them
+    mask = xobj.get("/Mask")
+    if xobj.get("/ImageMask") or (mask is not None and isinstance(mask.get_object(), list)):
+        return False
+
+    img = xobj.decode_as_image()
+    if img.mode.startswith("I;16"):
+        # 16-bit grey: keep the top byte rather than letting convert() clip
+        img = Image.fromarray((np.asarray(img).astype(np.uint16) >> 8).astype(np.uint8), mode="L")
+    elif img.mode in ("1", "LA"):
+        img = img.convert("L")
+    elif img.mode not in ("L", "RGB"):
+        img = img.convert("RGB")
+    h2 = max(1, int(round(img.height / ratio)))
+    w2 = max(1, int(round(img.width / ratio)))
+    small = Image.fromarray(area_resample(np.asarray(img), h2, w2), mode=img.mode)
+
+    buf = io.BytesIO()
+    small.save(buf, format="JPEG", quality=quality, optimize=True)
+    data = buf.getvalue()
+    if len(data) >= len(xobj._data):
+        return False
+
+    for key in ("/DecodeParms", "/Decode", "/Intent"):
+        xobj.pop(key, None)
+    xobj[NameObject("/Filter")] = NameObject("/DCTDecode")
+    xobj[NameObject("/ColorSpace")] = NameObject("/DeviceGray" if small.mode == "L" else "/DeviceRGB")
+    xobj[NameObject("/BitsPerComponent")] = NumberObject(8)
+    xobj[NameObject("/Width")] = NumberObject(small.width)
+    xobj[NameObject("/Height")] = NumberObject(small.height)
+    xobj._data = data
+
+    # keep the soft mask the same size as the image it belongs to
+    smask = xobj.get("/SMask")
+    if smask is not None:
+        smask = smask.get_object()
+        if (smask["/Width"], smask["/Height"]) != (w2, h2):
+            alpha = np.asarray(smask.decode_as_image().convert("L"))
+            resize_flate_gray(smask, area_resample(alpha, h2, w2))
+    return True
+
+def resize_flate_gray(xobj, arr) -> None:
+    """Replace a stream's pixels with an 8-bit grey array, Flate-encoded."""
+    from pypdf.generic import NameObject, NumberObject
+
+    for key in ("/DecodeParms", "/Decode"):
+        xobj.pop(key, None)
+    xobj[NameObject("/Filter")] = NameObject("/FlateDecode")
+    xobj[NameObject("/ColorSpace")] = NameObject("/DeviceGray")
+    xobj[NameObject("/BitsPerComponent")] = NumberObject(8)
+    xobj[NameObject("/Width")] = NumberObject(arr.shape[1])
+    xobj[NameObject("/Height")] = NumberObject(arr.shape[0])
+    xobj._data = zlib.compress(arr.tobytes(), 9)
+
+def output_path(src: Path) -> Path:
+    return src.with_name(f"{src.stem}{KEYWORD}{src.suffix}")
+
+def optimise_file(src: Path, target_dpi: int = TARGET_DPI, quality: int = JPEG_QUALITY) -> dict:
+    """
+    Downsample oversized images in one PDF. Runs inside a worker process.
+    Returns a small report dict (plain types, so it pickles cheaply).
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    before = src.stat().st_size
+    dst = output_path(src)
+    report = {"name": src.name, "out": dst.name, "before": before, "after": before,
+              "images": 0, "status": "unchanged"}
+
+    writer = PdfWriter(clone_from=PdfReader(src))
+
+    # Gather every page before re-encoding anything, so an image drawn in
+    # several places is sized for the one where it is shown largest
+    image_dpi: dict = {}
+    for page in writer.pages:
+        for idnum, dpi in collect_image_dpi(writer, page).items():
+            image_dpi[idnum] = min(image_dpi.get(idnum, dpi), dpi)
+
+    for idnum, dpi in image_dpi.items():
+        ratio = dpi / target_dpi
+        if ratio < MIN_RATIO:
+            continue
+        try:
+            if reencode_image(writer.get_object(idnum), ratio, quality):
+                report["images"] += 1
+        except Exception:
+            # unsupported colour space / filter: leave that image as-is
+            continue
+
+    if not report["images"]:
+        return report
+
+    writer.compress_identical_objects()
+    buf = io.BytesIO()
+    writer.write(buf)
+    after = buf.tell()
+    report["after"] = after
+
+    if after >= before:
+        report["status"] = "refused (output not smaller)"
+        return report
+
+    tmp = dst.with_name(dst.name + ".part")
+    tmp.write_bytes(buf.getvalue())
+    os.replace(tmp, dst)
+    report["status"] = "written"
+    return report
+
+def gather_inputs(args: list[str]) -> list[Path]:
+    if args:
+        return [Path(a).resolve() for a in args]
+    return sorted(
+        [p for p in SRC_DIR.iterdir()
+         if p.is_file() and p.suffix.lower() == ".pdf" and KEYWORD.lower() not in p.name.lower()],
+        key=lambda p: p.name.lower(),
+    )
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Lossy image downsampling for image-heavy PDFs.")
+    ap.add_argument("files", nargs="*", help=f"PDFs to optimise (default: all in {SRC_DIR})")
+    ap.add_argument("--dpi", type=int, default=TARGET_DPI, help="target effective DPI")
+    ap.add_argument("--quality", type=int, default=JPEG_QUALITY, help="JPEG quality 1-95")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes")
+    ns = ap.parse_args(argv)
+
+    files = gather_inputs(ns.files)
+    if not files:
+        print("No PDFs to optimise in:", SRC_DIR)
+        return
+
+    written = refused = errors = 0
+    with ProcessPoolExecutor(max_workers=ns.workers) as pool:
+        futures = {f: pool.submit(optimise_file, f, ns.dpi, ns.quality) for f in files}
+        for f, fut in futures.items():
+            try:
+                r = fut.result()
+            except Exception as e:
+                errors += 1
+                print(f"ERROR: {f.name}: {e}")
+                continue
+            if r["status"] == "written":
+                written += 1
+                saved = 100.0 * (1 - r["after"] / r["before"])
+                print(f"WROTE: {r['name']}  {human_size(r['before'])} -> {human_size(r['after'])}"
+                      f"  (-{saved:.0f}%, {r['images']} image(s))  ->  {r['out']}")
+            else:
+                if r["status"].startswith("refused"):
+                    refused += 1
+                print(f"SKIP:  {r['name']}  {human_size(r['before'])} -> {human_size(r['after'])}  {r['status']}")
+
+    print("\nSummary")
+    print("-------")
+    print(f"Written: {written}")
+    print(f"Refused: {refused} (output would not be smaller)")
+    print(f"Errors:  {errors}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+# pdf_preflight.py
+# Location: E:/pdfhub/pdf/
+# Run:      python E:/pdfhub/pdf/pdf_preflight.py [folder-or-files...] [--quarantine]
+#
+# FAST integrity check for PDFs (catches half-copied / truncated / corrupt files):
+# - %PDF- header near the start, %%EOF near the end
+# - startxref points inside the file at an "xref" table or an xref stream object
+# - a sample of xref entries point at real "N G obj" headers
+# - reads only the head, the tail and the sampled offsets (mmap), never the whole file
+# - checks files in parallel, caches verdicts by size + mtime in .pdf_preflight_cache.json
+# - with --quarantine, bad files are MOVED to E:/pdfhub/_quarantine/
+#
+# The movers quarantine bad files from staging. pdf_builder.py and
+# pdf_aggressive_push.py only report bad files already in the repo (the push
+# stops), so a false positive can never move a published PDF out of the repo.
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import re
+import shutil
+import sys
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent                  # E:/pdfhub/pdf
+QUARANTINE_DIR = ROOT.parent / "_quarantine"            # E:/pdfhub/_quarantine
+CACHE_FILE = ROOT / ".pdf_preflight_cache.json"
+CACHE_VERSION = 1
+
+HEAD_BYTES = 1024
+TAIL_BYTES = 2048
+SAMPLE_OFFSETS = 16
+
+RE_STARTXREF = re.compile(rb"startxref\s+(\d+)\s+%%EOF", re.S)
+RE_OBJ = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj\b")
+RE_SUBSECTION = re.compile(rb"\s*(\d+)\s+(\d+)\s*[\r\n]")
+
+def _sample(seq: list, k: int) -> list:
+    if len(seq) <= k:
+        return seq
+    step = len(seq) / k
+    return [seq[int(i * step)] for i in range(k)]
+
+def _obj_at(mm, off: int) -> re.Match | None:
+    if off < 0 or off >= len(mm):
+        return None
+    return RE_OBJ.match(mm, off, min(len(mm), off + 64))
+
+RE_PREV = re.compile(rb"/Prev\s+(\d+)")
+MAX_SECTIONS = 8
+
+def _table_offsets(mm, off: int) -> tuple[list[int], int | None]:
+    """
+    Offsets of sampled in-use ('n') entries from a classic xref table at off,
+    plus the trailer's /Prev offset (or None).
+    """
+    pos = off + 4  # past "xref"
+    offsets = []
+    sections = 0
+    while True:
+        m = RE_SUBSECTION.match(mm, pos, min(len(mm), pos + 64))
+        if not m:
+            break
+        count = int(m.group(2))
+        sections += 1
+        pos = m.end()
+        while pos < len(mm) and mm[pos] in b" \r\n":
+            pos += 1
+        # Entries are meant to be 20 bytes (18 + two-byte EOL), but some
+        # writers end them with a bare "\n"; take the width from the first one
+        width = 20
+        if count and mm[pos + 18:pos + 19] in (b"\r", b"\n") \
+                and mm[pos + 18:pos + 20] != b"\r\n":
+            width = 19
+        end = pos + width * count
+        if end > len(mm):
+            raise ValueError("xref table runs past end of file")
+        # Entries are fixed width, so only the sampled ones need parsing
+        for i in _sample(range(count), SAMPLE_OFFSETS):
+            entry = mm[pos + width * i: pos + width * i + 18]
+            if entry[17:18] == b"n":
+                offsets.append(int(entry[:10]))
+        pos = end
+    if not sections or mm[pos:pos + 16].lstrip()[:7] != b"trailer":
+        raise ValueError("malformed xref table")
+    trailer = mm[pos:mm.find(b">>", pos, pos + 4096) + 2]
+    prev = RE_PREV.search(trailer)
+    return offsets, int(prev.group(1)) if prev else None
+
+def _unpredict(raw: bytes, columns: int, picks: list[int]) -> list[bytes]:
+    """
+    Undo PNG predictors on rows of `columns` bytes, returning only rows `picks`.
+    The all-"Up" case (what nearly every writer emits) is a running sum down
+    each column, so it is done with accumulate() instead of a per-byte loop.
+    """
+    row = columns + 1
+    n = len(raw) // row
+    raw = raw[:n * row]
+    if set(raw[0::row]) <= {2}:
+        cols = [list(accumulate(raw[1 + j::row])) for j in range(columns)]
+        return [bytes(c[i] & 0xFF for c in cols) for i in picks]
+
+    rows = []
+    prior = bytearray(columns)
+    for i in range(n):
+        kind, cur = raw[i * row], bytearray(raw[i * row + 1:(i + 1) * row])
+        if kind == 1:
+            for j in range(1, columns):
+                cur[j] = (cur[j] + cur[j - 1]) & 0xFF
+        elif kind == 2:
+            for j in range(columns):
+                cur[j] = (cur[j] + prior[j]) & 0xFF
+        elif kind != 0:
+            raise ValueError("unsupported xref stream predictor")
+        rows.append(bytes(cur))
+        prior = cur
+    return [rows[i] for i in picks]
+
+def _stream_offsets(mm, m: re.Match) -> tuple[list[int], int | None]:
+    """
+    Offsets of sampled type-1 entries from an xref stream object, plus
+    its /Prev offset (or None).
+    """
+    start = m.end()
+    s = mm.find(b"stream", start)
+    if s < 0:
+        raise ValueError("xref stream has no data")
+    d = mm[start:s]
+    w = re.search(rb"/W\s*\[\s*(\d+)\s+(\d+)\s+(\d+)\s*\]", d)
+    ln = re.search(rb"/Length\s+(\d+)(?!\s+\d+\s+R)", d)
+    if not w or not ln:
+        raise ValueError("xref stream dictionary incomplete")
+    prev = RE_PREV.search(d)
+    prev = int(prev.group(1)) if prev else None
+    if re.search(rb"/Filter\s*/(?!FlateDecode)", d):
+        return [], prev  # unusual filter: header checks are enough here
+
+    data_start = s + 6
+    if mm[data_start:data_start + 1] == b"\r":
+        data_start += 1
+    if mm[data_start:data_start + 1] == b"\n":
+        data_start += 1
+    data_end = data_start + int(ln.group(1))
+    if data_end > len(mm):
+        raise ValueError("xref stream runs past end of file")
+    raw = mm[data_start:data_end]
+    if b"/FlateDecode" in d:
+        raw = zlib.decompress(raw)
+
+    w1, w2, w3 = (int(x) for x in w.groups())
+    row = w1 + w2 + w3
+    pred = re.search(rb"/Predictor\s+(\d+)", d)
+    if pred and int(pred.group(1)) >= 10:
+        picks = _sample(range(len(raw) // (row + 1)), SAMPLE_OFFSETS * 4)
+        rows = _unpredict(raw, row, picks)
+    else:
+        picks = _sample(range(len(raw) // row), SAMPLE_OFFSETS * 4)
+        rows = [raw[i * row:(i + 1) * row] for i in picks]
+
+    offsets = []
+    for r in rows:
+        kind = int.from_bytes(r[:w1], "big") if w1 else 1
+        if kind == 1:
+            offsets.append(int.from_bytes(r[w1:w1 + w2], "big"))
+    return offsets, prev
+
+def _xref_offsets(mm, xref_at: int) -> tuple[list[int], int | None]:
+    if mm[xref_at:xref_at + 4] == b"xref":
+        return _table_offsets(mm, xref_at)
+    m = _obj_at(mm, xref_at)
+    if not m:
+        raise ValueError(f"xref section missing at offset {xref_at}")
+    return _stream_offsets(mm, m)
+
+def check_pdf(path: Path) -> str | None:
+    """
+    Structural sanity check. Returns None if the file looks complete,
+    otherwise a short reason string.
+    """
+    try:
+        size = path.stat().st_size
+        if size < 64:
+            return "too small to be a PDF"
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pdf_at = mm.find(b"%PDF-", 0, HEAD_BYTES)
+            if pdf_at < 0:
+                return "missing %PDF- header"
+
+            tail_at = max(0, size - TAIL_BYTES)
+            tail = mm[tail_at:]
+            if b"%%EOF" not in tail:
+                return "missing %%EOF (truncated?)"
+            hits = list(RE_STARTXREF.finditer(tail))
+            if not hits:
+                return "missing startxref"
+            startxref = int(hits[-1].group(1))
+            if startxref >= size:
+                return "startxref points past end of file"
+
+            # Offsets are absolute, except in files with junk before the header
+            # where some writers make them relative to %PDF-
+            for base in sorted({0, pdf_at}):
+                xref_at = base + startxref
+                if mm[xref_at:xref_at + 4] == b"xref" or _obj_at(mm, xref_at):
+                    break
+            else:
+                return "startxref does not point at an xref"
+
+            # Follow /Prev so linearized and incrementally-updated files
+            # get their main xref section checked too
+            seen = set()
+            while xref_at is not None and xref_at not in seen and len(seen) < MAX_SECTIONS:
+                seen.add(xref_at)
+                offsets, prev = _xref_offsets(mm, xref_at)
+                for off in _sample(offsets, SAMPLE_OFFSETS):
+                    if not _obj_at(mm, base + off):
+                        return f"xref entry points at garbage (offset {off})"
+                xref_at = base + prev if prev is not None else None
+    except (OSError, ValueError, zlib.error) as e:
+        return f"unreadable: {e}"
+    return None
+
+def _load_cache() -> dict:
+    try:
+        data = json.loads(CACHE_FILE.read_text(encoding="utf-8"))
+        if data.get("version") == CACHE_VERSION:
+            return data.get("files", {})
+    except (OSError, ValueError):
+        pass
+    return {}
+
+def _save_cache(files: dict) -> None:
+    # Forget files that have since been moved or deleted, so the cache only
+    # ever holds what is on disk now
+    files = {k: v for k, v in files.items() if os.path.exists(k)}
+    tmp = CACHE_FILE.with_name(CACHE_FILE.name + ".part")
+    try:
+        tmp.write_text(json.dumps({"version": CACHE_VERSION, "files": files}), encoding="utf-8")
+        os.replace(tmp, CACHE_FILE)
+    except OSError:
+        pass  # cache is only an optimisation
+
+def check_many(paths: list[Path], workers: int | None = None) -> dict[Path, str | None]:
+    """
+    Check many PDFs in parallel. Returns {path: None (ok) or reason}.
+    Verdicts are cached by size + mtime, so unchanged files cost one stat().
+    """
+    cache = _load_cache()
+    results: dict[Path, str | None] = {}
+    todo: list[tuple[Path, str, list]] = []
+
+    for p in paths:
+        try:
+            st = p.stat()
+        except OSError as e:
+            results[p] = f"unreadable: {e}"
+            continue
+        key = str(p.resolve())
+        stamp = [st.st_size, st.st_mtime_ns]
+        hit = cache.get(key)
+        if hit and hit[:2] == stamp:
+            results[p] = hit[2]
+        else:
+            todo.append((p, key, stamp))
+
+    if todo:
+        with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 4)) as pool:
+            for (p, key, stamp), verdict in zip(todo, pool.map(lambda t: check_pdf(t[0]), todo)):
+                results[p] = verdict
+                cache[key] = stamp + [verdict]
+        _save_cache(cache)
+
+    return results
+
+def quarantine(src: Path) -> Path:
+    """MOVE src into QUARANTINE_DIR, appending (1), (2)... on name collision."""
+    QUARANTINE_DIR.mkdir(parents=True, exist_ok=True)
+    target = QUARANTINE_DIR / src.name
+    i = 1
+    while target.exists():
+        target = QUARANTINE_DIR / f"{src.stem} ({i}){src.suffix}"
+        i += 1
+    shutil.move(str(src), str(target))
+    return target
+
+def filter_good(paths: list[Path], move_bad: bool = True) -> list[Path]:
+    """
+    Return only the paths that pass check_many(), preserving order.
+    Bad files are reported and (by default) moved to QUARANTINE_DIR.
+    """
+    verdicts = check_many(paths)
+    good = []
+    for p in paths:
+        reason = verdicts.get(p)
+        if reason is None:
+            good.append(p)
+            continue
+        if move_bad:
+            try:
+                dst = quarantine(p)
+                print(f"QUARANTINED: {p.name}: {reason}  ->  {dst}")
+            except Exception as e:
+                print(f"BAD (could not quarantine: {e}): {p.name}: {reason}")
+        else:
+            print(f"BAD: {p.name}: {reason}")
+    return good
+
+def list_pdfs(folder: Path) -> list[Path]:
+    with os.scandir(folder) as it:
+        return sorted(
+            (Path(e.path) for e in it if e.is_file() and e.name.lower().endswith(".pdf")),
+            key=lambda p: p.name.lower(),
+        )
+
+def main(argv: list[str] | None = None) -> int:
+    args = sys.argv[1:] if argv is None else argv
+    move_bad = "--quarantine" in args
+    targets = [Path(a) for a in args if a != "--quarantine"] or [ROOT]
+
+    paths: list[Path] = []
+    for t in targets:
+        paths.extend(list_pdfs(t) if t.is_dir() else [t])
+
+    good = filter_good(paths, move_bad=move_bad)
+    bad = len(paths) - len(good)
+    print(f"Checked: {len(paths)}  OK: {len(good)}  Bad: {bad}")
+    return 1 if bad and not move_bad else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,367 @@
+# pdf_rules.py
+# Location: E:/pdfhub/pdf/
+# Run:      python pdf_rules.py            (dry run: print the plan)
+#           python pdf_rules.py --apply    (execute the plan)
+#
+# Rule-driven mover for the staging folder (E:/pdfhub/):
+# - Rules live in pdf_rules.json (this folder); first matching rule wins
+# - Each rule may test: name_glob / name_regex (case-insensitive), min_size / max_size,
+#   min_pages / max_pages, metadata {field: regex}, duplicate (true/false)
+# - Actions: "move" (into target subfolder of this folder, "" = here),
+#   "quarantine" (E:/pdfhub/_quarantine/) or "skip"
+# - The staging folder is read in ONE scandir pass; all rules are compiled
+#   up front and cheap tests (name, size) run before costly ones (hash, pypdf)
+# - Moves skip files whose name already exists in the target, like the movers
+#
+# Example pdf_rules.json:
+# [
+#   {"name": "published", "duplicate": true, "action": "skip"},
+#   {"name": "huge", "min_size": "50MB", "action": "quarantine"},
+#   {"name": "papers", "name_glob": "*exam*paper*.pdf", "target": "papers"},
+#   {"name": "optimised", "name_regex": "_optimised", "target": ""}
+# ]
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent                  # E:/pdfhub/pdf
+SRC_DIR = ROOT.parent                                   # E:/pdfhub
+RULES_FILE = ROOT / "pdf_rules.json"
+
+ACTIONS = ("move", "quarantine", "skip")
+UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+def parse_size(v) -> int:
+    """1048576, "1048576", "800KB", "5 MB" -> bytes."""
+    if isinstance(v, (int, float)):
+        return int(v)
+    m = re.fullmatch(r"\s*([\d.]+)\s*([KMG]?B)?\s*", str(v), re.I)
+    if not m:
+        raise ValueError(f"bad size {v!r}")
+    return int(float(m.group(1)) * UNITS[(m.group(2) or "B").upper()])
+
+@dataclass
+class Staged:
+    """One staged PDF. Costly facts (hash, page count, metadata) load on first use."""
+    path: Path
+    size: int
+    _sha256: str | None = None
+    _info: dict | None = None
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    def sha256(self) -> str:
+        if self._sha256 is None:
+            h = hashlib.sha256()
+            with open(self.path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+            self._sha256 = h.hexdigest()
+        return self._sha256
+
+    def info(self) -> dict:
+        """{"pages": int | None, "/Title": ..., ...} via pypdf (empty if unavailable)."""
+        if self._info is None:
+            self._info = {"pages": None}
+            try:
+                from pypdf import PdfReader
+
+                reader = PdfReader(self.path)
+                self._info["pages"] = len(reader.pages)
+                for k, v in (reader.metadata or {}).items():
+                    self._info[k] = str(v)
+            except Exception:
+                pass
+        return self._info
+
+@dataclass
+class Rule:
+    name: str
+    action: str = "move"
+    target: str = ""
+    name_res: list[re.Pattern] = field(default_factory=list)
+    min_size: int | None = None
+    max_size: int | None = None
+    min_pages: int | None = None
+    max_pages: int | None = None
+    metadata: dict[str, re.Pattern] = field(default_factory=dict)
+    duplicate: bool | None = None
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Rule":
+        known = {"name", "action", "target", "name_glob", "name_regex", "min_size", "max_size",
+                 "min_pages", "max_pages", "metadata", "duplicate"}
+        extra = set(d) - known
+        if extra:
+            raise ValueError(f"rule {d.get('name')!r}: unknown key(s) {sorted(extra)}")
+        action = d.get("action", "move")
+        if action not in ACTIONS:
+            raise ValueError(f"rule {d.get('name')!r}: action must be one of {ACTIONS}")
+
+        name_res = []
+        if "name_glob" in d:
+            name_res.append(re.compile("^(?i:" + fnmatch.translate(d["name_glob"]) + ")"))
+        if "name_regex" in d:
+            name_res.append(re.compile(d["name_regex"], re.I))
+
+        return cls(
+            name=d.get("name", "unnamed"),
+            action=action,
+            target=d.get("target", ""),
+            name_res=name_res,
+            min_size=parse_size(d["min_size"]) if "min_size" in d else None,
+            max_size=parse_size(d["max_size"]) if "max_size" in d else None,
+            min_pages=d.get("min_pages"),
+            max_pages=d.get("max_pages"),
+            metadata={("/" + k.lstrip("/")): re.compile(v, re.I) for k, v in d.get("metadata", {}).items()},
+            duplicate=d.get("duplicate"),
+        )
+
+class Matcher:
+    """
+    All rules compiled once. classify() tests rules in order, cheapest checks
+    first, and only touches the file (hash / pypdf) when a rule still needs it.
+    """
+
+    def __init__(self, rules: list[Rule], published: dict[int, set[str]] | None = None):
+        self.rules = rules
+        # {size: {sha256}} of files already in ROOT; a staged file can only be a
+        # duplicate if its size is in here, so most files are never hashed
+        self.published = published or {}
+        # When every rule tests the name, files no rule could match are
+        # rejected by one combined regex before any per-rule work. Joining
+        # patterns renumbers their groups, which breaks backreferences, so
+        # only do it when no first pattern has capture groups.
+        self.prefilter = None
+        if rules and all(r.name_res and r.name_res[0].groups == 0 for r in rules):
+            try:
+                self.prefilter = re.compile(
+                    "|".join(f"(?:{r.name_res[0].pattern})" for r in rules), re.I)
+            except re.error:
+                pass  # e.g. inline flags mid-pattern; per-rule checks still apply
+
+    def is_duplicate(self, f: Staged) -> bool:
+        hashes = self.published.get(f.size)
+        return bool(hashes) and f.sha256() in hashes
+
+    def classify(self, f: Staged) -> Rule | None:
+        if self.prefilter is not None and not self.prefilter.search(f.name):
+            return None
+        for r in self.rules:
+            if any(not p.search(f.name) for p in r.name_res):
+                continue
+            if r.min_size is not None and f.size < r.min_size:
+                continue
+            if r.max_size is not None and f.size > r.max_size:
+                continue
+            if r.duplicate is not None and self.is_duplicate(f) != r.duplicate:
+                continue
+            if r.min_pages is not None or r.max_pages is not None or r.metadata:
+                info = f.info()
+                pages = info["pages"]
+                if r.min_pages is not None and (pages is None or pages < r.min_pages):
+                    continue
+                if r.max_pages is not None and (pages is None or pages > r.max_pages):
+                    continue
+                if any(not p.search(info.get(k, "")) for k, p in r.metadata.items()):
+                    continue
+            return r
+        return None
+
+@dataclass
+class PlanItem:
+    src: Path
+    rule: str
+    action: str             # move / quarantine / skip, or "bad" (failed pre-flight)
+    dest_dir: Path | None
+    note: str = ""
+
+def load_rules(path: Path = RULES_FILE) -> list[Rule]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, list):
+        raise ValueError(f"{path.name}: expected a JSON list of rules")
+    return [Rule.from_dict(d) for d in data]
+
+def scan_staging(src_dir: Path = SRC_DIR) -> list[Staged]:
+    """Every PDF directly in src_dir, from a single scandir pass."""
+    out = []
+    with os.scandir(src_dir) as it:
+        for e in it:
+            if e.name.lower().endswith(".pdf") and e.is_file():
+                out.append(Staged(Path(e.path), e.stat().st_size))
+    out.sort(key=lambda s: s.name.lower())
+    return out
+
+def published_hashes() -> dict[int, set[str]]:
+    """
+    {size: {sha256}} for the PDFs already in ROOT. Hashes come from the
+    catalogue; PDFs it has not caught up with are hashed here, with a warning.
+    """
+    import pdf_catalogue
+
+    try:
+        known = {f["name"]: f for f in pdf_catalogue.files()}
+    except Exception as e:
+        print(f"WARNING: catalogue unavailable ({e}); hashing published PDFs directly")
+        known = {}
+
+    out: dict[int, set[str]] = {}
+    stale = 0
+    with os.scandir(ROOT) as it:
+        for e in it:
+            if not (e.name.lower().endswith(".pdf") and e.is_file()):
+                continue
+            st = e.stat()
+            f = known.get(e.name)
+            if f and f["sha256"] and (f["size"], f["mtime"]) == (st.st_size, int(st.st_mtime)):
+                sha = f["sha256"]
+            else:
+                stale += 1
+                sha = Staged(Path(e.path), st.st_size).sha256()
+            out.setdefault(st.st_size, set()).add(sha)
+    if stale:
+        print(f"WARNING: catalogue is behind for {stale} published PDF(s); hashed them directly. "
+              "Run pdf_builder.py or 'python pdf_catalogue.py sync' to catch it up.")
+    return out
+
+def build_plan(rules: list[Rule], staged: list[Staged] | None = None,
+               preflight: bool = True) -> list[PlanItem]:
+    """
+    Classify staged PDFs and resolve what --apply will really do with each:
+    moves whose name already exists in the target become "skip", and (with
+    preflight) moves that fail pdf_preflight become "bad", so the dry run
+    matches execution.
+    """
+    if staged is None:
+        staged = scan_staging()
+    needs_dupes = any(r.duplicate is not None for r in rules)
+    matcher = Matcher(rules, published_hashes() if needs_dupes else None)
+    plan = []
+    for f in staged:
+        r = matcher.classify(f)
+        if r is None:
+            continue
+        dest = (ROOT / r.target).resolve() if r.action == "move" else None
+        plan.append(PlanItem(f.path, r.name, r.action, dest))
+
+    moves = [it for it in plan if it.action == "move"]
+    verdicts = {}
+    if preflight and moves:
+        from pdf_preflight import check_many
+
+        verdicts = check_many([it.src for it in moves])
+
+    dest_names: dict[Path, set[str]] = {}
+    for it in moves:
+        reason = verdicts.get(it.src)
+        if reason is not None:
+            it.action, it.note = "bad", reason
+            continue
+        names = dest_names.get(it.dest_dir)
+        if names is None:
+            names = set()
+            if it.dest_dir.is_dir():
+                with os.scandir(it.dest_dir) as entries:
+                    names = {e.name.lower() for e in entries if e.is_file()}
+            dest_names[it.dest_dir] = names
+        if it.src.name.lower() in names:
+            it.action, it.note = "skip", "same filename already in destination"
+        else:
+            names.add(it.src.name.lower())
+    return plan
+
+def print_plan(plan: list[PlanItem]) -> None:
+    if not plan:
+        print("Plan is empty: no staged PDF matches a rule.")
+        return
+    for it in plan:
+        where = f"  ->  {it.dest_dir}" if it.action == "move" else ""
+        note = f"  ({it.note})" if it.note else ""
+        print(f"{it.action.upper():<10} [{it.rule}] {it.src.name}{where}{note}")
+
+def safe_move(src: Path, dest_dir: Path) -> Path:
+    """
+    Move src into dest_dir.
+    If dest exists, append (1), (2)... before extension.
+    Returns the destination path used.
+    """
+    target = dest_dir / src.name
+    i = 1
+    while target.exists():
+        target = dest_dir / f"{src.stem} ({i}){src.suffix}"
+        i += 1
+    shutil.move(str(src), str(target))
+    return target
+
+def execute_plan(plan: list[PlanItem]) -> dict:
+    """
+    Carry out a plan from build_plan() in one batch. Target folders are
+    created once, and the move history for the whole batch (moves and
+    quarantines) is written in a single transaction. Returns counts.
+    """
+    from pdf_catalogue import record_moves
+    from pdf_preflight import quarantine
+
+    counts = {"moved": 0, "skipped": 0, "quarantined": 0, "bad": 0, "errors": 0}
+    history = []
+
+    for d in {it.dest_dir for it in plan if it.action == "move"}:
+        d.mkdir(parents=True, exist_ok=True)
+
+    for it in plan:
+        try:
+            if it.action == "skip":
+                counts["skipped"] += 1
+            elif it.action in ("quarantine", "bad"):
+                dst = quarantine(it.src)
+                counts["quarantined" if it.action == "quarantine" else "bad"] += 1
+                history.append((it.src, dst, "quarantine"))
+                print(f"QUARANTINED: {it.src.name}  ->  {dst}" + (f"  ({it.note})" if it.note else ""))
+            else:
+                dst = safe_move(it.src, it.dest_dir)
+                counts["moved"] += 1
+                history.append((it.src, dst, "moved"))
+                print(f"MOVED: {it.src.name}  ->  {dst}")
+        except Exception as e:
+            counts["errors"] += 1
+            print(f"ERROR: {it.src.name}: {e}")
+
+    record_moves(history)
+    return counts
+
+def print_summary(counts: dict) -> None:
+    print("\nSummary")
+    print("-------")
+    print(f"Moved:       {counts['moved']}")
+    print(f"Skipped:     {counts['skipped']} (skip rule, or same filename already in destination)")
+    print(f"Quarantined: {counts['quarantined']} (quarantine rule)")
+    print(f"Bad:         {counts['bad']} (failed pre-flight check, quarantined)")
+    print(f"Errors:      {counts['errors']}")
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Rule-driven PDF mover (dry run unless --apply).")
+    ap.add_argument("--rules", type=Path, default=RULES_FILE, help="rules JSON file")
+    ap.add_argument("--apply", action="store_true", help="execute the plan")
+    ns = ap.parse_args(argv)
+
+    plan = build_plan(load_rules(ns.rules))
+    print_plan(plan)
+    if not ns.apply:
+        if plan:
+            print("\nDry run. Re-run with --apply to execute.")
+        return
+    print_summary(execute_plan(plan))
+
+if __name__ == "__main__":
+    main()
@@ -8,39 +8,29 @@
 # - Shows PDFs not already present in destination
 # - "Show selection" lets you review exactly what will move
 # - MOVE = shutil.move (no copies)
+# - Truncated / corrupt PDFs (pdf_preflight.py) are moved to E:/pdfhub/_quarantine/ instead
+# - Each move/quarantine is recorded in the catalogue history (pdf_catalogue.py)
 
 import os
 import shutil
 import tkinter as tk
+from pathlib import Path
 from tkinter import ttk, messagebox
 
+from pdf_catalogue import record_moves
+from pdf_preflight import QUARANTINE_DIR, check_many, quarantine
+from pdf_rules import scan_staging
+
 DEST_DIR = os.path.dirname(os.path.abspath(__file__))            # E:/pdfhub/pdf
 SRC_DIR = os.path.abspath(os.path.join(DEST_DIR, os.pardir))     # E:/pdfhub
 
 def list_candidates():
-    # destination filenames (case-insensitive)
-    existing = {
-        f.lower() for f in os.listdir(DEST_DIR)
-        if os.path.isfile(os.path.join(DEST_DIR, f))
-    }
-
-    out = []
-    for f in os.listdir(SRC_DIR):
-        full = os.path.join(SRC_DIR, f)
-        if not os.path.isfile(full):
-            continue
-
-        lf = f.lower()
-        if not lf.endswith(".pdf"):
-            continue
-
-        # skip if already in destination (same name)
-        if lf in existing:
-            continue
+    # destination filenames (case-insensitive), one scandir pass each side
+    with os.scandir(DEST_DIR) as it:
+        existing = {e.name.lower() for e in it if e.is_file()}
 
-        out.append(f)
-
-    return sorted(out, key=lambda x: x.lower())
+    # skip if already in destination (same name)
+    return [s.name for s in scan_staging(Path(SRC_DIR)) if s.name.lower() not in existing]
 
 def safe_move(src_path: str, dest_dir: str) -> str:
     """
@@ -176,19 +166,33 @@ class App(tk.Tk):
             return
 
         moved = 0
+        bad = []
         errors = []
+        history = []
+
+        paths = [Path(SRC_DIR, f) for f in selected if os.path.exists(os.path.join(SRC_DIR, f))]
+        verdicts = check_many(paths)
 
-        for f in selected:
-            src_path = os.path.join(SRC_DIR, f)
+        for p in paths:
             try:
-                if not os.path.exists(src_path):
-                    continue
-                safe_move(src_path, DEST_DIR)
-                moved += 1
+                if verdicts.get(p) is not None:
+                    dst_path = quarantine(p)
+                    bad.append(p.name)
+                    history.append((p, dst_path, "quarantine"))
+                else:
+                    dst_path = safe_move(str(p), DEST_DIR)
+                    moved += 1
+                    history.append((p, dst_path, "moved"))
             except Exception as e:
-                errors.append(f"{f}: {e}")
+                errors.append(f"{p.name}: {e}")
+
+        record_moves(history)
 
         msg = f"Moved: {moved}\nDestination: {DEST_DIR}"
+        if bad:
+            msg += f"\n\nQuarantined (truncated/corrupt) to {QUARANTINE_DIR}:\n" + "\n".join(bad[:20])
+            if len(bad) > 20:
+                msg += f"\n...and {len(bad) - 20} more."
         if errors:
             msg += "\n\nErrors:\n" + "\n".join(errors[:20])
             if len(errors) > 20: